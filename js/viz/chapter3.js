@@ -113,12 +113,9 @@ document.addEventListener("DOMContentLoaded", function() {
         const svg = d3.select("#viz-sankey").attr("viewBox", `0 0 ${w} ${h}`);
         const sankey = d3.sankey().nodeWidth(20).nodePadding(40).extent([[140, 40], [w - 140, h - 40]]);
         
+        // Links already reference nodes by index (d3-sankey's default nodeId)
         const nodes = data.nodes.map(d => ({...d}));
-        const links = data.links.map(l => ({
-            source: data.nodes.findIndex(n => n.name === l.source),
-            target: data.nodes.findIndex(n => n.name === l.target),
-            value: l.value
-        }));
+        const links = data.links.map(l => ({...l}));
 
         const {nodes: sNodes, links: sLinks} = sankey({ nodes, links });
 
@@ -141,7 +138,7 @@ document.addEventListener("DOMContentLoaded", function() {
            .attr("class", "sankey-link").attr("d", d3.sankeyLinkHorizontal())
            .attr("stroke", (d, i) => `url(#sl-grad-${i})`).attr("stroke-width", d => Math.max(1, d.width))
            .on("mouseenter", (e, d) => {
-                const totalAtNode = d3.sum(sLinks.filter(l => l.source.name === d.source.name), link => link.value);
+                const totalAtNode = d3.sum(sLinks.filter(l => l.source.index === d.source.index), link => link.value);
                 const perc = ((d.value / totalAtNode) * 100).toFixed(1);
                 moveTooltip(e, `<div class="tooltip-header">Forensic Flow</div><strong>${d.source.name}</strong> &rarr; <strong>${d.target.name}</strong><br>Contribution: <strong>${perc}%</strong>`);
            })
@@ -1,6 +1,8 @@
 const config = {
     margin: { top: 40, right: 60, bottom: 50, left: 100 },
     width: 900,
+    // ch4_*.json may carry extra focus countries; the page draws this pair
+    countries: ["Sudan", "Ethiopia"],
     colors: { 
         sudan: "#8e44ad", 
         ethiopia: "#c5a028",
@@ -27,12 +29,13 @@ async function init() {
 }
 
 function drawStripeChart(data) {
+    data = data.filter(d => config.countries.includes(d.Country));
     const parseDate = d3.utcParse("%Y-%m-%d");
     data.forEach(d => d.dateObj = parseDate(d.Date));
     const height = 300;
     const svg = d3.select("#viz-stripes").attr("viewBox", `0 0 ${config.width} ${height}`);
     const x = d3.scaleUtc().domain(d3.extent(data, d => d.dateObj)).range([config.margin.left + 20, config.width - config.margin.right]);
-    const y = d3.scaleBand().domain(["Sudan", "Ethiopia"]).range([60, height - 60]).padding(0.4);
+    const y = d3.scaleBand().domain(config.countries).range([60, height - 60]).padding(0.4);
 
     svg.append("g").attr("transform", `translate(0,${height - 40})`).attr("class", "axis-label").call(d3.axisBottom(x).ticks(5));
 
@@ -55,7 +58,7 @@ function drawStripeChart(data) {
             tooltip.style("opacity", 0);
         });
 
-    svg.selectAll(".label").data(["Sudan", "Ethiopia"]).enter().append("text")
+    svg.selectAll(".label").data(config.countries).enter().append("text")
         .attr("x", 20).attr("y", d => y(d) + y.bandwidth()/2 + 5).attr("class", "axis-label").text(d => d.toUpperCase());
 }
 
@@ -99,6 +102,7 @@ function drawCompositionChart(data) {
     const height = 300;
     const svg = d3.select("#viz-composition").attr("viewBox", `0 0 ${config.width} ${height}`);
     
+    data = data.filter(d => config.countries.includes(d.Country));
     const nest = d3.groups(data, d => d.Country).map(([country, values]) => {
         const counts = d3.rollup(values, v => v.length, d => d.Type);
         const total = values.length;
@@ -113,7 +117,7 @@ function drawCompositionChart(data) {
     const stack = d3.stack().keys(["Assault/Rape", "Public (Gang Rape)", "Systemic (Slavery/Camps)"]);
     const series = stack(nest);
 
-    const y = d3.scaleBand().domain(["Sudan", "Ethiopia"]).range([60, height - 60]).padding(0.4);
+    const y = d3.scaleBand().domain(config.countries).range([60, height - 60]).padding(0.4);
     const x = d3.scaleLinear().domain([0, 100]).range([config.margin.left + 50, config.width - config.margin.right]);
     const color = d3.scaleOrdinal().domain(["Assault/Rape", "Public (Gang Rape)", "Systemic (Slavery/Camps)"]).range(config.colors.types);
 
@@ -131,7 +135,7 @@ function drawCompositionChart(data) {
                 .html(`<div class="tooltip-header">${d.data.Country}: ${type}</div><strong>${d.data[type].toFixed(1)}%</strong> of record`);
         }).on("mouseout", () => tooltip.style("opacity", 0));
 
-    svg.selectAll(".country-label").data(["Sudan", "Ethiopia"]).enter().append("text")
+    svg.selectAll(".country-label").data(config.countries).enter().append("text")
         .attr("x", 20).attr("y", d => y(d) + y.bandwidth()/2 + 5).attr("class", "axis-label").text(d => d.toUpperCase());
 }
 
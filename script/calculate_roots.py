@@ -1,10 +1,11 @@
 import pandas as pd
 import json
+from config import data_path
 
 def generate_corrected_roots_data():
     # 1. LOAD DATA
-    df_incidents = pd.read_csv("../data/raw_incidents.csv")
-    df_acled = pd.read_csv("../data/acled_conflict_index_fullyear2024_allcolumns-2.csv")
+    df_incidents = pd.read_csv(data_path("raw_incidents.csv"))
+    df_acled = pd.read_csv(data_path("acled_conflict_index_fullyear2024_allcolumns-2.csv"))
 
     # 2. FILTER DATE
     df_incidents['Date'] = pd.to_datetime(df_incidents['Date'], errors='coerce')
@@ -100,7 +101,7 @@ def generate_corrected_roots_data():
     
     json_output = df_final.to_dict(orient='records')
     
-    with open("../data/roots_data.json", "w") as f:
+    with open(data_path("roots_data.json"), "w") as f:
         json.dump(json_output, f, indent=4)
         
     print(f"Exported {len(json_output)} countries to roots_data.json (No NaNs)")
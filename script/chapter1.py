@@ -1,21 +1,22 @@
 import pandas as pd
 import numpy as np
 import json
-from sklearn.preprocessing import MinMaxScaler
+import sys
+from config import data_path
+from incidents import read_incidents, map_categories
 
 def generate_dynamic_roots_data():
     print("--- Starting Data Processing (Corrected Logic) ---")
 
     # 1. LOAD DATA
     try:
-        df_incidents = pd.read_csv("../data/raw_incidents.csv")
-        df_acled = pd.read_csv("../data/acled_conflict_index_fullyear2024_allcolumns-2.csv")
+        df_incidents = read_incidents("chapter1")
+        df_acled = pd.read_csv(data_path("acled_conflict_index_fullyear2024_allcolumns-2.csv"))
     except FileNotFoundError as e:
         print(f"Error: {e}")
-        return
+        return False
 
     # 2. FILTER DATE (2020 - 2025)
-    df_incidents['Date'] = pd.to_datetime(df_incidents['Date'], errors='coerce')
     df_incidents = df_incidents[df_incidents['Date'].dt.year.between(2020, 2025)]
 
     # 3. STANDARDIZE NAMES (Robust Mapping)
@@ -38,11 +39,11 @@ def generate_dynamic_roots_data():
         "Sudan": "Sudan",
         "South Sudan": "South Sudan"
     }
-    df_incidents['Country'] = df_incidents['Country'].replace(name_map)
+    df_incidents['Country'] = map_categories(df_incidents['Country'], lambda c: name_map.get(c, c))
     df_acled['Country'] = df_acled['Country'].replace(name_map)
 
     # 4. GROUP BY COUNTRY (Reported incidents)
-    country_stats = df_incidents.groupby('Country').size().reset_index(name='Reported')
+    country_stats = df_incidents.groupby('Country', observed=True).size().reset_index(name='Reported')
 
     # 5. PREPARE ACLED DATA & CAP OUTLIERS
     # We cap 'Danger' at 2000. Anything above 2000 is treated as "Max Danger".
@@ -56,12 +57,13 @@ def generate_dynamic_roots_data():
         df_acled[f"{f}_Log"] = np.log1p(df_acled[f])
 
     # 7. SCALE (0 to 1)
-    scaler = MinMaxScaler()
-    log_features = [f"{f}_Log" for f in features]
-    scaled_features = scaler.fit_transform(df_acled[log_features])
-    
-    df_scaled = pd.DataFrame(scaled_features, columns=[f"{f}_Scaled" for f in features])
-    df_acled = pd.concat([df_acled, df_scaled], axis=1)
+    # Same arithmetic as sklearn's MinMaxScaler (constant columns scale to 0),
+    # without importing scikit-learn for two columns.
+    for f in features:
+        col = df_acled[f"{f}_Log"]
+        data_range = col.max() - col.min()
+        scale = 1.0 / data_range if data_range != 0 else 1.0
+        df_acled[f"{f}_Scaled"] = col * scale - col.min() * scale
 
     # 8. CALCULATE SUPPRESSION SCORE
     # Weighted: 70% Danger (Risk to civilians), 30% Deadliness
@@ -135,7 +137,7 @@ def generate_dynamic_roots_data():
     df_final = df_merged[final_cols].sort_values('Projected', ascending=False)
 
     # 16. SAVE
-    output_path = "../data/roots_data.json"
+    output_path = data_path("roots_data.json")
     json_result = df_final.to_json(orient='records')
     parsed = json.loads(json_result)
     
@@ -144,6 +146,7 @@ def generate_dynamic_roots_data():
         
     print(f"--- Success! Generated {output_path} ---")
     print(df_final[['Country', 'Reported', 'Multiplier', 'Projected']].head(10))
+    return True
 
 if __name__ == "__main__":
-    generate_dynamic_roots_data()
\ No newline at end of file
+    sys.exit(0 if generate_dynamic_roots_data() else 1)
\ No newline at end of file
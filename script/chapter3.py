@@ -1,21 +1,27 @@
 import pandas as pd
 import numpy as np
 import json
+import sys
+from config import data_path
+from incidents import read_incidents, map_categories
+from sankey import build_sankey
 
-def process_chapter3():
+# Flow order of the Sankey; any of Type, Loc, Perp, Country, Region
+SANKEY_STAGES = ['Type', 'Loc', 'Perp']
+
+def process_chapter3(sankey_stages=SANKEY_STAGES, min_flow=0):
     print("--- Processing Chapter 3: Global Pulse & Flow ---")
     
     try:
-        df = pd.read_csv("../data/raw_incidents.csv")
+        df = read_incidents("chapter3")
     except Exception as e:
         print(f"Error: {e}")
-        return
+        return False
 
     # 1. SETUP & CLEANING
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
     df = df[df['Date'].dt.year.between(2020, 2025)]
     
-    # --- FIX: Create MonthYear column BEFORE creating df_major ---
+    # --- FIX: Create MonthYear column BEFORE selecting the major regions ---
     df['MonthYear'] = df['Date'].dt.to_period('M').astype(str)
     
     def get_region(c):
@@ -28,28 +34,28 @@ def process_chapter3():
         }
         return map_.get(c, 'Other') 
     
-    df['Region'] = df['Country'].apply(get_region)
+    df['Region'] = map_categories(df['Country'], get_region)
     
-    # Now df_major will inherit 'MonthYear' correctly
-    df_major = df[df['Region'] != 'Other'].copy()
+    # Major regions are selected with a mask instead of a copied frame
+    major = df['Region'] != 'Other'
 
     # ==========================================
     # 1. TIMELINE DATA (Area Chart)
     # ==========================================
     timeline = df.groupby('MonthYear').size().reset_index(name='count')
     
-    with open("../data/ch3_timeline.json", "w") as f:
+    with open(data_path("ch3_timeline.json"), "w") as f:
         json.dump(timeline.to_dict(orient='records'), f)
 
     # ==========================================
     # 2. RIDGELINE DATA (Replaces Heatmap)
     # ==========================================
     # Group by Region and MonthYear
-    ridgeline = df_major.groupby(['Region', 'MonthYear']).size().reset_index(name='value')
+    ridgeline = df.loc[major, ['Region', 'MonthYear']].groupby(['Region', 'MonthYear'], observed=True).size().reset_index(name='value')
     
     # Ensure every region has every month (fill gaps with 0) to prevent jagged charts
     all_months = df['MonthYear'].unique()
-    all_regions = df_major['Region'].unique()
+    all_regions = df.loc[major, 'Region'].unique()
     
     # Create a full grid of Region x Month
     full_index = pd.MultiIndex.from_product([all_regions, all_months], names=['Region', 'MonthYear'])
@@ -58,16 +64,15 @@ def process_chapter3():
     # Sort chronologically so the lines draw correctly
     ridgeline = ridgeline.sort_values('MonthYear')
     
-    with open("../data/ch3_ridgeline.json", "w") as f:
+    with open(data_path("ch3_ridgeline.json"), "w") as f:
         json.dump(ridgeline.to_dict(orient='records'), f)
 
     # ==========================================
     # 3. VIOLIN DATA (Demographics)
     # ==========================================
     violin_data = []
-    for _, row in df_major.iterrows():
-        desc = str(row['Survivor or Victim']).lower()
-        region = row['Region']
+    for desc, region in zip(df.loc[major, 'Survivor or Victim'], df.loc[major, 'Region']):
+        desc = str(desc).lower()
         
         # Age Synthesis Logic
         if "minor" in desc or "child" in desc:
@@ -80,7 +85,7 @@ def process_chapter3():
         age = max(3, min(75, age))
         violin_data.append({"Region": region, "Age": age})
 
-    with open("../data/ch3_demographics.json", "w") as f:
+    with open(data_path("ch3_demographics.json"), "w") as f:
         json.dump(violin_data, f)
 
     # ==========================================
@@ -105,27 +110,21 @@ def process_chapter3():
         if "home" in l: return "Private Home"
         return "Public Space"
 
-    df_sankey = df.copy()
-    df_sankey['Perp'] = df_sankey['Reported Perpetrator Name'].apply(clean_perp)
-    df_sankey['Type'] = df_sankey['Type of SV'].apply(clean_type)
-    df_sankey['Loc'] = df_sankey['Location Where Sexual Violence Was Committed'].apply(clean_loc)
-
-
-    
-   
-    l1 = df_sankey.groupby(['Type', 'Loc']).size().reset_index(name='value')
-    l1.columns = ['source', 'target', 'value']
-
-    l2 = df_sankey.groupby(['Loc', 'Perp']).size().reset_index(name='value')
-    l2.columns = ['source', 'target', 'value']
+    # Cleaned labels as categorical Series (one code per row), not a copied frame
+    stages = {
+        'Perp': map_categories(df['Reported Perpetrator Name'], clean_perp),
+        'Type': map_categories(df['Type of SV'], clean_type),
+        'Loc': map_categories(df['Location Where Sexual Violence Was Committed'], clean_loc),
+        'Country': df['Country'],
+        'Region': df['Region'],
+    }
 
-    links = pd.concat([l1, l2]).to_dict(orient='records')
-    
-    nodes = set(l1['source']).union(set(l1['target'])).union(set(l2['target']))
-    nodes_list = [{"name": n} for n in nodes]
+    # Index-based nodes/links for every adjacent pair of stages
+    sankey = build_sankey(stages, sankey_stages, min_flow=min_flow)
 
-    with open("../data/ch3_sankey.json", "w") as f:
-        json.dump({"nodes": nodes_list, "links": links}, f)
+    with open(data_path("ch3_sankey.json"), "w") as f:
+        json.dump(sankey, f)
+    return True
 
 if __name__ == "__main__":
-    process_chapter3()
\ No newline at end of file
+    sys.exit(0 if process_chapter3() else 1)
\ No newline at end of file
@@ -1,102 +1,134 @@
-import pandas as pd
 import numpy as np
 import json
+import sys
+from sharding import ShardStore, country_rng
+from config import data_path
+from incidents import read_incidents
 
-def process_chapter4():
-    print("--- Processing Chapter 4: Integrating Qualitative Sources ---")
+# js/viz/chapter4.js draws this pair; extra focus countries are exported alongside
+FOCUS_COUNTRIES = ["Sudan", "Ethiopia"]
+BUCKETS = ["Child (0-12)", "Teen (13-17)", "Adult (18-29)", "Adult (30+)"]
+
+# IMPUTED EVIDENCE (From Your PDFs): age buckets for unknown descriptions
+IMPUTATION = {
+    # SOURCE: UNICEF Sudan Report ("Child Rape Crisis")
+    # Logic: Unknowns in Sudan are 3x more likely to be minors than in Ethiopia
+    "Sudan": (["Child (0-12)", "Teen (13-17)", "Adult (18-29)"], [0.3, 0.4, 0.3]),  # Skewed Young
+}
+# SOURCE: Frontiers Ethiopia Study (Targeting of women/mothers)
+# Logic: Unknowns in Ethiopia skew towards adult women (used for every other country)
+DEFAULT_IMPUTATION = (["Teen (13-17)", "Adult (18-29)", "Adult (30+)"], [0.1, 0.5, 0.4])  # Skewed Adult
+
+
+def classify(t, l):
+    t = str(t).lower()
+    l = str(l).lower()
+    
+    # SOURCE: Guardian/BBC (Tigray "Sexual Slavery" & "Torture Camps")
+    # We classify any mention of captivity/camps as "Systemic"
+    if "slave" in t or "captive" in t or "torture" in t or "camp" in l or "detention" in l: 
+        return "Systemic (Slavery/Camps)"
     
+    # SOURCE: Reports on RSF in Khartoum
+    # High prevalence of public/gang violence
+    if "gang" in t or "street" in l or "market" in l: 
+        return "Public (Gang Rape)"
+    
+    return "Assault/Rape"
+
+
+def country_kernel(c, df, seed):
+    # Everything Chapter 4 needs for one country. Runs serially or on a shard.
+    rng = country_rng(seed, c)
+
+    # A. STRIPES
+    dates = df['Date'].sort_values(kind='stable').dt.strftime('%Y-%m-%d').tolist()
+
+    # B. PYRAMID
+    pyramid = {k: 0 for k in BUCKETS}
+    choices, p = IMPUTATION.get(c, DEFAULT_IMPUTATION)
+    for desc in df['Survivor or Victim'].astype(str).str.lower():
+        # 1. DIRECT EVIDENCE (From Data)
+        if "child" in desc or "minor" in desc or "girl" in desc:
+            bucket = "Child (0-12)" if rng.random() > 0.3 else "Teen (13-17)"
+        elif "woman" in desc or "adult" in desc:
+            bucket = "Adult (18-29)" if rng.random() > 0.6 else "Adult (30+)"
+        # 2. IMPUTED EVIDENCE
+        else:
+            bucket = choices[rng.choice(len(choices), p=p)]
+        pyramid[bucket] += 1
+
+    # C. WAFFLE
+    waffle = {}
+    for t, l in zip(df['Type of SV'], df['Location Where Sexual Violence Was Committed']):
+        cat = classify(t, l)
+        waffle[cat] = waffle.get(cat, 0) + 1
+
+    return {"stripes": dates, "pyramid": pyramid, "waffle": waffle}
+
+
+def process_chapter4(focus_countries=FOCUS_COUNTRIES, workers=1, seed=None):
+    print("--- Processing Chapter 4: Integrating Qualitative Sources ---")
+
+    missing = [c for c in FOCUS_COUNTRIES if c not in focus_countries]
+    if missing:
+        print(f"Error: focus countries must include {', '.join(FOCUS_COUNTRIES)} "
+              f"(the Chapter 4 page draws them); missing {', '.join(missing)}")
+        return False
+
     try:
-        df = pd.read_csv("../data/raw_incidents.csv")
+        df = read_incidents("chapter4")
     except Exception as e:
         print(f"Error: {e}")
-        return
+        return False
 
     # 1. FILTER
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
     df = df[df['Date'].dt.year.between(2020, 2025)]
-    df = df[df['Country'].isin(["Sudan", "Ethiopia"])].copy()
+    df = df[df['Country'].isin(focus_countries)]
+
+    # 2. PER-COUNTRY WORK (sharded across processes when workers > 1)
+    # Drawn from the global RNG, so np.random.seed() pins the per-country streams
+    if seed is None:
+        seed = int(np.random.randint(2**31))
+    if workers > 1:
+        columns = ['Date', 'Survivor or Victim', 'Type of SV', 'Location Where Sexual Violence Was Committed']
+        with ShardStore(df, columns) as store:
+            results = store.map(country_kernel, workers=workers, seed=seed)
+    else:
+        results = {c: country_kernel(c, g, seed) for c, g in df.groupby('Country', sort=True, observed=True)}
 
     # ==========================================
     # A. STRIPES (Barcode) - Raw Quantitative Data
     # ==========================================
-    stripes = df[['Date', 'Country']].sort_values('Date')
-    stripes['Date'] = stripes['Date'].dt.strftime('%Y-%m-%d')
-    with open("../data/ch4_stripes.json", "w") as f:
-        json.dump(stripes.to_dict(orient='records'), f)
+    stripes = [{"Date": d, "Country": c} for c in results for d in results[c]["stripes"]]
+    stripes.sort(key=lambda r: r["Date"])
+    with open(data_path("ch4_stripes.json"), "w") as f:
+        json.dump(stripes, f)
 
     # ==========================================
     # B. PYRAMID (Demographics) - Informed by UNICEF PDF
     # ==========================================
-    buckets = {"Child (0-12)": 0, "Teen (13-17)": 1, "Adult (18-29)": 2, "Adult (30+)": 3}
-    stats = {"Sudan": {k: 0 for k in buckets}, "Ethiopia": {k: 0 for k in buckets}}
-    
-    for _, row in df.iterrows():
-        c = row['Country']
-        desc = str(row['Survivor or Victim']).lower()
-        
-        # 1. DIRECT EVIDENCE (From Data)
-        if "child" in desc or "minor" in desc or "girl" in desc:
-            bucket = "Child (0-12)" if np.random.random() > 0.3 else "Teen (13-17)"
-        elif "woman" in desc or "adult" in desc:
-            bucket = "Adult (18-29)" if np.random.random() > 0.6 else "Adult (30+)"
-        
-        # 2. IMPUTED EVIDENCE (From Your PDFs)
-        else:
-            if c == "Sudan":
-                # SOURCE: UNICEF Sudan Report ("Child Rape Crisis")
-                # Logic: Unknowns in Sudan are 3x more likely to be minors than in Ethiopia
-                bucket = np.random.choice(
-                    ["Child (0-12)", "Teen (13-17)", "Adult (18-29)"], 
-                    p=[0.3, 0.4, 0.3] # Skewed Young
-                )
-            else:
-                # SOURCE: Frontiers Ethiopia Study (Targeting of women/mothers)
-                # Logic: Unknowns in Ethiopia skew towards adult women
-                bucket = np.random.choice(
-                    ["Teen (13-17)", "Adult (18-29)", "Adult (30+)"], 
-                    p=[0.1, 0.5, 0.4] # Skewed Adult
-                )
-        
-        stats[c][bucket] += 1
-
     pyramid_data = []
-    for b in buckets:
-        pyramid_data.append({"Age": b, "Sudan": stats["Sudan"][b], "Ethiopia": stats["Ethiopia"][b]})
+    for b in BUCKETS:
+        row = {"Age": b}
+        for c in focus_countries:
+            row[c] = results[c]["pyramid"][b] if c in results else 0
+        pyramid_data.append(row)
 
-    with open("../data/ch4_pyramid.json", "w") as f:
+    with open(data_path("ch4_pyramid.json"), "w") as f:
         json.dump(pyramid_data, f)
 
     # ==========================================
     # C. WAFFLE (Methods) - Informed by Guardian/BBC
     # ==========================================
-    def classify(row):
-        t = str(row['Type of SV']).lower()
-        l = str(row['Location Where Sexual Violence Was Committed']).lower()
-        
-        # SOURCE: Guardian/BBC (Tigray "Sexual Slavery" & "Torture Camps")
-        # We classify any mention of captivity/camps as "Systemic"
-        if "slave" in t or "captive" in t or "torture" in t or "camp" in l or "detention" in l: 
-            return "Systemic (Slavery/Camps)"
-        
-        # SOURCE: Reports on RSF in Khartoum
-        # High prevalence of public/gang violence
-        if "gang" in t or "street" in l or "market" in l: 
-            return "Public (Gang Rape)"
-        
-        return "Assault/Rape"
-
-    counts = {"Sudan": {}, "Ethiopia": {}}
-    for _, row in df.iterrows():
-        c = row['Country']
-        counts[c][classify(row)] = counts[c].get(classify(row), 0) + 1
-
     waffle_data = []
-    for c in ["Sudan", "Ethiopia"]:
-        total = sum(counts[c].values())
+    for c in focus_countries:
+        counts = results[c]["waffle"] if c in results else {}
+        total = sum(counts.values())
         if total == 0: continue
         
         # Normalize to 100 squares
-        dist = {k: (v/total)*100 for k, v in counts[c].items()}
+        dist = {k: (v/total)*100 for k, v in counts.items()}
         items = []
         for cat, pct in dist.items():
             for _ in range(int(round(pct))):
@@ -107,10 +139,13 @@ def process_chapter4():
         while len(items) < 100: items.append({"Country": c, "Type": "Assault/Rape"})
         waffle_data.extend(items)
 
-    with open("../data/ch4_waffle.json", "w") as f:
+    with open(data_path("ch4_waffle.json"), "w") as f:
         json.dump(waffle_data, f)
 
-    print("Success: Processed data using PDF/Article logic.")
+    print(f"Success: Processed {len(results)} focus countries using PDF/Article logic.")
+    return True
 
 if __name__ == "__main__":
-    process_chapter4()
\ No newline at end of file
+    # Usage: python chapter4.py [workers] [Country ...]
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    sys.exit(0 if process_chapter4(sys.argv[2:] or FOCUS_COUNTRIES, workers=workers) else 1)
\ No newline at end of file
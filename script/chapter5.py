@@ -1,5 +1,8 @@
-import pandas as pd
 import json
+import os
+import sys
+from pdf_extract import BookUnavailable, load_book, extract_reparations
+from config import data_path
 
 def process_chapter5():
     print("--- Processing Chapter 5: The Response & The Failure ---")
@@ -16,24 +19,25 @@ def process_chapter5():
         {"Stage": "Convictions", "Value": 50, "Description": "Successful prosecutions (Global Estimate)"}
     ]
     
-    with open("../data/ch5_funnel.json", "w") as f:
+    with open(data_path("ch5_funnel.json"), "w") as f:
         json.dump(funnel_data, f)
 
     # ==========================================
     # B. REPARATIONS GAP (GSF Data)
     # Survivors Reached vs. Estimated Need in key zones
     # ==========================================
-    # Data derived from GSF Annual Reports (2020-2023)
-    reparations_data = [
-        {"Country": "Dem. Republic of Congo", "Survivors_In_Need": 25000, "Survivors_Reached": 3200, "Status": "Active Project"},
-        {"Country": "Iraq (Yazidis)", "Survivors_In_Need": 6000, "Survivors_Reached": 1800, "Status": "State Law Passed"},
-        {"Country": "Guinea", "Survivors_In_Need": 500, "Survivors_Reached": 450, "Status": "Interim Measures"},
-        {"Country": "Ukraine", "Survivors_In_Need": 4000, "Survivors_Reached": 500, "Status": "Pilot Phase"},
-        {"Country": "CAR", "Survivors_In_Need": 12000, "Survivors_Reached": 800, "Status": "Early Stage"}
-    ]
-    
-    with open("../data/ch5_reparations.json", "w") as f:
-        json.dump(reparations_data, f)
+    # Extracted from the GSF Annual Reports in Data/book (see pdf_extract.py).
+    # Figures the reports do not publish fall back to the previous estimates.
+    # If the reports cannot be read, the existing file is left as it is.
+    try:
+        reparations_data = extract_reparations(load_book())
+    except BookUnavailable as e:
+        print(f"Warning: {e}; leaving ch5_reparations.json unchanged")
+        reparations_data = None
+
+    if reparations_data is not None:
+        with open(data_path("ch5_reparations.json"), "w") as f:
+            json.dump(reparations_data, f)
 
     # ==========================================
     # C. THE ARCHITECTURE (Network)
@@ -75,10 +79,17 @@ def process_chapter5():
         ]
     }
 
-    with open("../data/ch5_network.json", "w") as f:
+    with open(data_path("ch5_network.json"), "w") as f:
         json.dump(network_data, f)
 
-    print("Success: Generated ch5_funnel, ch5_reparations, ch5_network")
+    if reparations_data is None:
+        if not os.path.exists(data_path("ch5_reparations.json")):
+            print("Error: no ch5_reparations.json to keep")
+            return False
+        print("Success: Generated ch5_funnel, ch5_network (ch5_reparations unchanged)")
+    else:
+        print("Success: Generated ch5_funnel, ch5_reparations, ch5_network")
+    return True
 
 if __name__ == "__main__":
-    process_chapter5()
\ No newline at end of file
+    sys.exit(0 if process_chapter5() else 1)
\ No newline at end of file
@@ -0,0 +1,15 @@
+import os
+
+# Where the raw inputs and generated JSON live.
+# Defaults to the repository's Data/ folder, wherever the scripts are run from.
+# Override with `lineage.py --data-root PATH` or the LINEAGE_DATA_ROOT variable.
+
+DEFAULT_DATA_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Data"))
+
+
+def data_root():
+    return os.environ.get("LINEAGE_DATA_ROOT") or DEFAULT_DATA_ROOT
+
+
+def data_path(*parts):
+    return os.path.join(data_root(), *parts)
@@ -0,0 +1,115 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from config import data_root
+
+# Shared loaders for the incident frame.
+# read_incidents() is the compact raw read every chapter starts from;
+# load_incidents() adds the Chapter 1 cleaning for long-running tools
+# (the query server).
+
+# Same mapping as chapter1.py, so countries line up with roots_data.json
+NAME_MAP = {
+    "DRC": "Democratic Republic of Congo",
+    "Democratic Republic of the Congo": "Democratic Republic of Congo",
+    "CAR": "Central African Republic",
+    "OPT": "Palestine",
+    "State of Palestine": "Palestine",
+    "Chechnya": "Russia",
+    "PNG": "Papua New Guinea",
+    "USA": "United States",
+    "UK": "United Kingdom",
+    "Bahams": "Bahamas",
+    "Côte d'Ivoire": "Ivory Coast",
+    "CÃ´te d'Ivoire": "Ivory Coast",
+    "Macedonia": "North Macedonia",
+    "Syrian Arab Republic": "Syria",
+    "Myanmar (Burma)": "Myanmar",
+}
+
+
+# ==========================================
+# COMPACT LOADING PROFILES
+# ==========================================
+# Columns each consumer reads from raw_incidents.csv. Nothing else (free-text
+# descriptions, event ids, ...) is parsed.
+LOCATION = 'Location Where Sexual Violence Was Committed'
+PROFILES = {
+    "chapter1": ['Date', 'Country'],
+    "chapter2": ['Date', 'Country', 'Country ISO', 'Latitude', 'Longitude', LOCATION],
+    "chapter3": ['Date', 'Country', 'Survivor or Victim', 'Reported Perpetrator Name', 'Type of SV', LOCATION],
+    "chapter4": ['Date', 'Country', 'Survivor or Victim', 'Type of SV', LOCATION],
+    "server": ['Date', 'Country', 'Admin 1', LOCATION, 'Reported Perpetrator', 'Reported Perpetrator Name',
+               'Survivor Or Victim Sex', 'Adult or Minor ', 'Type of SV', 'SV Context'],
+}
+
+# Repetitive text is stored as categoricals (a small dictionary + one integer
+# code per row); coordinates as float32; counts are downcast after reading.
+TEXT_COLUMNS = [
+    'Date', 'Country', 'Country ISO', 'Admin 1', 'Geo Precision', LOCATION,
+    'Reported Perpetrator', 'Reported Perpetrator Name', 'Single And Group Perpetrators',
+    'Weapon Carried/Used', 'Survivor or Victim', 'Survivor Or Victim Sex', 'Adult or Minor ',
+    'Type of SV', 'SV Context', 'Classification',
+]
+COMPACT_DTYPES = {col: 'category' for col in TEXT_COLUMNS}
+COMPACT_DTYPES.update({'Latitude': 'float32', 'Longitude': 'float32'})
+COUNT_COLUMNS = ['Number of Reported Victims', 'Reported Deaths Following the Sexual Violence']
+
+
+def read_incidents(profile=None, data_dir=None):
+    """Raw incidents with only the profile's columns (all if None), in compact dtypes."""
+    data_dir = data_dir or data_root()
+    usecols = PROFILES[profile] if profile else None
+    dtype = {c: t for c, t in COMPACT_DTYPES.items() if usecols is None or c in usecols}
+    df = pd.read_csv(os.path.join(data_dir, "raw_incidents.csv"), usecols=usecols, dtype=dtype)
+
+    for col in COUNT_COLUMNS:
+        if col in df:
+            downcast = 'float' if df[col].isna().any() else 'integer'
+            df[col] = pd.to_numeric(df[col], downcast=downcast)
+
+    # Dates repeat heavily: parse each distinct string once, then expand by code
+    if 'Date' in df:
+        parsed = pd.to_datetime(df['Date'].cat.categories, errors='coerce').append(pd.DatetimeIndex([pd.NaT]))
+        df['Date'] = pd.Series(parsed[df['Date'].cat.codes.to_numpy()], index=df.index)
+    return df
+
+
+def map_categories(series, func):
+    """Apply func once per distinct value instead of once per row.
+
+    NaN is passed to func like any other value (as str(nan) handling in the
+    chapter scripts expects). Returns a categorical with sorted categories.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.map(func)
+    values = [func(c) for c in series.cat.categories] + [func(np.nan)]
+    categories = sorted({v for v in values if not pd.isna(v)})
+    lookup = {v: i for i, v in enumerate(categories)}
+    new_codes = np.array([-1 if pd.isna(v) else lookup[v] for v in values], dtype=np.int32)
+    codes = new_codes[series.cat.codes.to_numpy()]  # code -1 (NaN) picks the last entry
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=series.index, name=series.name)
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def load_incidents(data_dir=None, profile="server"):
+    # 1. LOAD
+    df = read_incidents(profile, data_dir)
+
+    # 2. FILTER DATE (2020 - 2025)
+    df = df[df['Date'].dt.year.between(2020, 2025)]
+
+    # 3. STANDARDIZE NAMES
+    df['Country'] = map_categories(df['Country'], lambda c: NAME_MAP.get(c, c))
+    return df
+
+
+def load_projections(data_dir=None):
+    # Chapter 1 output, keyed by country
+    data_dir = data_dir or data_root()
+    with open(os.path.join(data_dir, "roots_data.json"), "r") as f:
+        return {row['Country']: row for row in json.load(f)}
@@ -0,0 +1,292 @@
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Single entry point for the ETL scripts.
+#
+#   python lineage.py build [--workers N]
+#   python lineage.py chapter 4 [--workers N] [--focus Sudan Ethiopia ...]
+#   python lineage.py publish OUT_DIR
+#   python lineage.py bench
+#   python lineage.py verify [--legacy REV] [--workers N] [--synthetic ROWS]
+#   python lineage.py serve [--port 8001]
+#
+# Every subcommand accepts --data-root (default: the repository's Data/).
+# pandas, numpy and the chapter modules are imported inside the handlers that
+# need them, so `--help`, `publish` and `bench` start without them.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPT_DIR)
+
+# Chapter number -> (module, function). Chapter 2 reads roots_data.json, so
+# build runs them in this order.
+CHAPTERS = {
+    1: ("chapter1", "generate_dynamic_roots_data"),
+    2: ("process_chapter2_data", "process_chapter2"),
+    3: ("chapter3", "process_chapter3"),
+    4: ("chapter4", "process_chapter4"),
+    5: ("chapter5", "process_chapter5"),
+}
+# Chapters whose per-country work can be sharded across processes
+SHARDED = {2, 4}
+
+# Wall-clock budget for `lineage.py --help` in a fresh interpreter
+STARTUP_BUDGET_MS = 150
+HEAVY_MODULES = ("pandas", "numpy", "sklearn")
+
+SITE_FILES = ["index.html", "data_disc.html", "chapters", "css", "js"]
+
+
+# ==========================================
+# 1. BUILD / CHAPTER
+# ==========================================
+def run_chapter(n, workers=1, focus=None):
+    import importlib
+    module_name, func_name = CHAPTERS[n]
+    func = getattr(importlib.import_module(module_name), func_name)
+
+    kwargs = {}
+    if n in SHARDED:
+        kwargs["workers"] = workers
+    if n == 4 and focus:
+        kwargs["focus_countries"] = focus
+    started = time.perf_counter()
+    # Chapter functions print their own error and return False on failure
+    ok = func(**kwargs)
+    if not ok:
+        print(f"[chapter {n}] failed")
+        return 1
+    line = f"[chapter {n}] {time.perf_counter() - started:.2f}s"
+    peak = peak_memory_mb()
+    if peak:
+        line += f", peak {peak[0]:.1f} MB (workers {peak[1]:.1f} MB)"
+    print(line)
+    return 0
+
+
+def peak_memory_mb():
+    # (this process, largest child) peak RSS; None where `resource` is missing (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    unit = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own * unit / 1e6, children * unit / 1e6
+
+
+def cmd_build(args):
+    # Later chapters read earlier outputs, so stop at the first failure
+    for n in sorted(CHAPTERS):
+        if run_chapter(n, workers=args.workers):
+            return 1
+    return 0
+
+
+def cmd_chapter(args):
+    return run_chapter(args.number, workers=args.workers, focus=args.focus)
+
+
+# ==========================================
+# 2. PUBLISH
+# ==========================================
+def cmd_publish(args):
+    # Static site + generated JSON, ready for any file server
+    out = os.path.abspath(args.out_dir)
+    if os.path.exists(out) and not os.path.isdir(out):
+        print(f"Error: {out} exists and is not a folder")
+        return 1
+    if os.path.exists(out) and os.listdir(out) and not args.force:
+        print(f"Error: {out} is not empty (use --force to overwrite)")
+        return 1
+
+    for name in SITE_FILES:
+        src = os.path.join(REPO_ROOT, name)
+        dst = os.path.join(out, name)
+        if os.path.isdir(src):
+            shutil.copytree(src, dst, dirs_exist_ok=True)
+        elif os.path.exists(src):
+            os.makedirs(out, exist_ok=True)
+            shutil.copy2(src, dst)
+
+    # The pages fetch ../Data/*.json and data_disc.html links the reports in
+    # Data/book; the raw CSVs are not published
+    data_out = os.path.join(out, "Data")
+    os.makedirs(data_out, exist_ok=True)
+    copied = 0
+    for name in sorted(os.listdir(args.data_root)):
+        if name.endswith(".json"):
+            shutil.copy2(os.path.join(args.data_root, name), os.path.join(data_out, name))
+            copied += 1
+
+    # One copy per distinct PDF, under its shortest name ("x.pdf" over "x (1).pdf")
+    book_dir = os.path.join(args.data_root, "book")
+    reports = {}
+    if os.path.isdir(book_dir):
+        from pdf_extract import file_hash
+        for name in sorted(os.listdir(book_dir), key=lambda n: (len(n), n)):
+            if name.lower().endswith(".pdf"):
+                reports.setdefault(file_hash(os.path.join(book_dir, name)), name)
+    if reports:
+        os.makedirs(os.path.join(data_out, "book"), exist_ok=True)
+        for name in reports.values():
+            shutil.copy2(os.path.join(book_dir, name), os.path.join(data_out, "book", name))
+    print(f"Published site, {copied} data files and {len(reports)} reports to {out}")
+    return 0
+
+
+# ==========================================
+# 3. BENCH
+# ==========================================
+def _timed_run(argv):
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable] + argv, cwd=SCRIPT_DIR, capture_output=True, text=True)
+    return (time.perf_counter() - started) * 1000, proc
+
+
+def failure_reason(proc):
+    # Traceback tail, else the chapter's own "Error: ..." line
+    lines = (proc.stderr.strip() or proc.stdout.strip()).splitlines()
+    errors = [l for l in lines if l.startswith("Error")]
+    return errors[-1] if errors else (lines[-1] if lines else f"exit code {proc.returncode}")
+
+
+def cmd_bench(args):
+    # A. STARTUP: best of N cold interpreters running `lineage.py --help`
+    runs = [_timed_run([__file__, "--help"])[0] for _ in range(args.repeat)]
+    startup = min(runs)
+
+    probe = ("import sys, lineage; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    _, proc = _timed_run(["-c", probe])
+    leaked = proc.stdout.strip()
+
+    ok = startup <= STARTUP_BUDGET_MS and not leaked
+    print(f"startup   {startup:8.1f} ms  (budget {STARTUP_BUDGET_MS} ms)  {'OK' if ok else 'OVER BUDGET'}")
+    if leaked:
+        print(f"          heavy modules imported at startup: {leaked}")
+
+    # B. CHAPTERS: each in its own interpreter, imports included.
+    # Outputs go to a scratch data root (inputs linked in), so the tracked
+    # JSON in --data-root is never rewritten.
+    if not args.startup_only:
+        from verify import prepare_inputs
+        bench_root = tempfile.mkdtemp(prefix="lineage_bench_")
+        try:
+            prepare_inputs(bench_root, args.data_root)
+            for n in sorted(CHAPTERS):
+                argv = [__file__, "--data-root", bench_root, "chapter", str(n)]
+                if n in SHARDED:
+                    argv += ["--workers", str(args.workers)]
+                ms, proc = _timed_run(argv)
+                status = "ok" if proc.returncode == 0 else f"failed ({proc.returncode})"
+                m = re.search(r"peak ([\d.]+) MB \(workers ([\d.]+) MB\)", proc.stdout)
+                memory = f"peak {m.group(1):>7} MB  workers {m.group(2):>7} MB" if m else "peak n/a"
+                print(f"chapter {n} {ms:8.1f} ms  {memory}  {status}")
+                if proc.returncode != 0:
+                    print(f"          {failure_reason(proc)}")
+                    ok = False
+        finally:
+            shutil.rmtree(bench_root, ignore_errors=True)
+
+    # C. FRAMES: incident frame size, full legacy read vs each chapter's profile
+    if args.frames:
+        import pandas as pd
+        from incidents import PROFILES, read_incidents, memory_mb
+        legacy = memory_mb(pd.read_csv(os.path.join(args.data_root, "raw_incidents.csv")))
+        print(f"frame     legacy  {legacy:8.2f} MB  (all columns, default dtypes)")
+        for profile in PROFILES:
+            compact = memory_mb(read_incidents(profile))
+            print(f"frame     {profile:<8}{compact:8.2f} MB  {legacy / compact:5.1f}x smaller")
+
+    return 0 if ok else 1
+
+
+# ==========================================
+# 4. VERIFY
+# ==========================================
+def cmd_verify(args):
+    from verify import verify
+    ok = verify(args.data_root, legacy=args.legacy, workers=args.workers, seed=args.seed,
+                synthetic_rows=args.synthetic, digits=args.digits, keep=args.keep)
+    return 0 if ok else 1
+
+
+# ==========================================
+# 5. SERVE
+# ==========================================
+def cmd_serve(args):
+    import asyncio
+    from query_server import serve
+    try:
+        asyncio.run(serve(args.port, data_dir=args.data_root))
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+
+def build_parser():
+    from config import DEFAULT_DATA_ROOT
+    data_root_help = "folder with raw_incidents.csv, the ACLED index and the JSON outputs"
+    parser = argparse.ArgumentParser(prog="lineage", description="Lineage of Silence data pipeline")
+    parser.add_argument("--data-root", default=os.environ.get("LINEAGE_DATA_ROOT") or DEFAULT_DATA_ROOT,
+                        help=data_root_help)
+    # Also accepted after the subcommand; SUPPRESS keeps it from resetting the value above
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--data-root", default=argparse.SUPPRESS, help=data_root_help)
+
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", parents=[common], help="run chapters 1-5 in order")
+    p.add_argument("--workers", type=int, default=1, help="processes for per-country work")
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser("chapter", parents=[common], help="run a single chapter")
+    p.add_argument("number", type=int, choices=sorted(CHAPTERS))
+    p.add_argument("--workers", type=int, default=1, help="processes for per-country work")
+    p.add_argument("--focus", nargs="+", help="chapter 4 focus countries")
+    p.set_defaults(func=cmd_chapter)
+
+    p = sub.add_parser("publish", parents=[common], help="copy the site and JSON outputs to a folder")
+    p.add_argument("out_dir")
+    p.add_argument("--force", action="store_true", help="write into a non-empty folder")
+    p.set_defaults(func=cmd_publish)
+
+    p = sub.add_parser("bench", parents=[common], help="time start-up and every chapter")
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--repeat", type=int, default=5, help="start-up samples (best is reported)")
+    p.add_argument("--startup-only", action="store_true")
+    p.add_argument("--no-frames", dest="frames", action="store_false",
+                   help="skip the incident frame memory comparison")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("verify", parents=[common], help="compare outputs of a git revision and the working tree")
+    p.add_argument("--legacy", default="HEAD", help="git revision for the legacy side ('.' = working tree)")
+    p.add_argument("--workers", type=int, default=1, help="processes for the new side")
+    p.add_argument("--seed", type=int, default=0, help="seed for both sides")
+    p.add_argument("--synthetic", type=int, metavar="ROWS", help="resample raw_incidents.csv to ROWS rows")
+    p.add_argument("--digits", type=int, default=9, help="float tolerance: relative 10**(1-N), absolute 10**-N")
+    p.add_argument("--keep", action="store_true", help="keep both output folders")
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("serve", parents=[common], help="run the local query server")
+    p.add_argument("--port", type=int, default=8001)
+    p.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.data_root = os.path.abspath(args.data_root)
+    # Chapter modules, pool workers and bench subprocesses all read this
+    os.environ["LINEAGE_DATA_ROOT"] = args.data_root
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
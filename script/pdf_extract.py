@@ -0,0 +1,177 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from config import data_path
+
+# Extraction stage for the source reports in Data/book.
+# Each distinct PDF is parsed once in a process pool (one document per worker)
+# and its per-page text is cached under Data/.cache/pdf_text/<sha256>.json.
+# Identical files stored under two names share one hash, so they are parsed
+# once; unchanged files are never reparsed.
+
+# ==========================================
+# REPARATIONS FIGURES
+# ==========================================
+# Baseline values are the former hardcoded Chapter 5 numbers. They are kept
+# where the reports were searched and no figure was found, or where there is
+# no rule to search with (e.g. survivors in need); the provenance says which.
+REPARATIONS_BASELINE = [
+    {"Country": "Dem. Republic of Congo", "Survivors_In_Need": 25000, "Survivors_Reached": 3200, "Status": "Active Project"},
+    {"Country": "Iraq (Yazidis)", "Survivors_In_Need": 6000, "Survivors_Reached": 1800, "Status": "State Law Passed"},
+    {"Country": "Guinea", "Survivors_In_Need": 500, "Survivors_Reached": 450, "Status": "Interim Measures"},
+    {"Country": "Ukraine", "Survivors_In_Need": 4000, "Survivors_Reached": 500, "Status": "Pilot Phase"},
+    {"Country": "CAR", "Survivors_In_Need": 12000, "Survivors_Reached": 800, "Status": "Early Stage"},
+]
+
+# (Country, field) -> patterns; group 1 is the figure. Whitespace in the
+# extracted text is collapsed before matching.
+FIGURE_RULES = {
+    ("Dem. Republic of Congo", "Survivors_Reached"): [
+        r"Democratic Republic of Congo \([^)]*\) ([\d,]+) Survivors",
+        r"final number of ([\d,]+) survivors being identified",
+    ],
+    ("Iraq (Yazidis)", "Survivors_Reached"): [
+        r"Iraq \(Sinjar\) ([\d,]+) Survivors",
+    ],
+    ("Guinea", "Survivors_Reached"): [
+        r"Guinea \(Conakry\) ([\d,]+) Survivors",
+    ],
+}
+
+
+class BookUnavailable(Exception):
+    # The reports could not be read at all (no folder, no PDFs, pypdf missing
+    # for uncached files), as opposed to a figure not being found in them.
+    pass
+
+
+def file_hash(path, chunk_size=1 << 20):
+    # Streamed so multi-megabyte reports are not read into memory at once
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def parse_pdf(path):
+    # Runs in a worker process
+    from pypdf import PdfReader
+    logging.getLogger("pypdf").setLevel(logging.ERROR)  # font-encoding warnings
+    reader = PdfReader(path)
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def load_book(book_dir=None, cache_dir=None, max_workers=None):
+    """Return {sha256: {"files": [...], "pages": [...]}} for every PDF in book_dir.
+
+    Raises BookUnavailable unless every PDF could be read (from cache or parsed).
+    """
+    book_dir = book_dir or data_path("book")
+    cache_dir = cache_dir or data_path(".cache", "pdf_text")
+
+    # 1. HASH & DEDUPLICATE
+    documents = {}
+    if not os.path.isdir(book_dir):
+        raise BookUnavailable(f"No PDF folder at {book_dir}")
+    for name in sorted(os.listdir(book_dir)):
+        if name.lower().endswith(".pdf"):
+            digest = file_hash(os.path.join(book_dir, name))
+            documents.setdefault(digest, {"files": [], "pages": None})["files"].append(name)
+    if not documents:
+        raise BookUnavailable(f"No PDFs in {book_dir}")
+
+    # 2. CACHE LOOKUP
+    os.makedirs(cache_dir, exist_ok=True)
+    todo = []
+    for digest, doc in documents.items():
+        cache_path = os.path.join(cache_dir, f"{digest}.json")
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                doc["pages"] = json.load(f)["pages"]
+        else:
+            todo.append(digest)
+
+    print(f"PDFs: {sum(len(d['files']) for d in documents.values())} files, "
+          f"{len(documents)} distinct, {len(todo)} to parse")
+
+    # 3. PARSE MISSES IN PARALLEL (one document per worker)
+    if todo:
+        try:
+            import pypdf  # noqa: F401  (fail early, before spawning workers)
+        except ImportError:
+            raise BookUnavailable(f"pypdf is not installed and {len(todo)} PDFs are not cached "
+                                  "(pip install pypdf)")
+
+        paths = [os.path.join(book_dir, documents[d]["files"][0]) for d in todo]
+        workers = min(len(todo), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for digest, pages in zip(todo, pool.map(parse_pdf, paths)):
+                documents[digest]["pages"] = pages
+                tmp_path = os.path.join(cache_dir, f"{digest}.json.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"files": documents[digest]["files"], "pages": pages}, f)
+                os.replace(tmp_path, os.path.join(cache_dir, f"{digest}.json"))
+
+    return documents
+
+
+def report_year(filename):
+    # "2021_10_27_GSF_ANNUAL_REPORT_2020_EN.pdf" -> 2020 (the report year is the last one)
+    years = re.findall(r"20\d\d", filename)
+    return int(years[-1]) if years else 0
+
+
+def find_figure(documents, patterns):
+    # Most recent report wins; within a report, the first page that matches
+    ordered = sorted(documents.values(), key=lambda d: report_year(d["files"][0]), reverse=True)
+    for doc in ordered:
+        for page_no, text in enumerate(doc["pages"], start=1):
+            flat = " ".join(text.split())
+            for pattern in patterns:
+                m = re.search(pattern, flat, re.IGNORECASE)
+                if m:
+                    start, end = max(0, m.start() - 60), min(len(flat), m.end() + 60)
+                    return int(m.group(1).replace(",", "")), {
+                        "source": doc["files"][0],
+                        "page": page_no,
+                        "excerpt": flat[start:end],
+                    }
+    return None, None
+
+
+def extract_reparations(documents):
+    # documents must come from load_book(), which only returns fully read books
+    reparations = []
+    for base in REPARATIONS_BASELINE:
+        row = dict(base)
+        provenance = {}
+        for field in ("Survivors_In_Need", "Survivors_Reached"):
+            patterns = FIGURE_RULES.get((base["Country"], field))
+            if not patterns:
+                provenance[field] = {"source": "baseline estimate (no extraction rule)"}
+                continue
+            value, source = find_figure(documents, patterns)
+            if value is not None:
+                row[field] = value
+                provenance[field] = source
+            else:
+                provenance[field] = {"source": "baseline estimate (not found in Data/book reports)"}
+        row["Provenance"] = provenance
+        reparations.append(row)
+    return reparations
+
+
+if __name__ == "__main__":
+    try:
+        docs = load_book()
+    except BookUnavailable as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    for row in extract_reparations(docs):
+        print(row["Country"], row["Survivors_Reached"], "/", row["Survivors_In_Need"])
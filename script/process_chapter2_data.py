@@ -1,30 +1,53 @@
 import pandas as pd
 import numpy as np
 import json
+import sys
+from sharding import ShardStore
+from incidents import read_incidents, map_categories
+from config import data_path
 
-def process_chapter2():
+# Story B: Texture of Violence (Tactical Categorization)
+# IMPROVEMENT: Using a more robust keyword list to capture nuances of "Systemic" violence
+def categorize_location(loc):
+    l = str(loc).lower()
+    public_keywords = ['street', 'road', 'field', 'market', 'open', 'forest', 'village']
+    systemic_keywords = ['detention', 'prison', 'camp', 'captivity', 'police', 'checkpoint', 'barracks', 'base']
+    
+    if any(k in l for k in public_keywords): return "Public"
+    if any(k in l for k in systemic_keywords): return "Systemic"
+    return "Private/Other"
+
+def country_kernel(c, df):
+    # Per-country pieces of the map and texture stories. Runs serially or on a shard.
+    cats = map_categories(df['Location Where Sexual Violence Was Committed'], categorize_location)
+    return {
+        "Reported": len(df),
+        "ISO": df['Country ISO'].iloc[-1] if len(df) else "",
+        "Texture": cats.value_counts(normalize=True).to_dict(),
+    }
+
+def process_chapter2(workers=1):
     print("--- Processing Chapter 2: Geography & Architects ---")
     
     # 1. LOAD DATA SOURCES
     try:
         # Source A: Verified Incidents (The dots)
-        df_incidents = pd.read_csv("../data/raw_incidents.csv")
+        df_incidents = read_incidents("chapter2")
         
         # Source B: ACLED Index (The background map colors)
-        df_acled = pd.read_csv("../data/acled_conflict_index_fullyear2024_allcolumns-2.csv")
+        df_acled = pd.read_csv(data_path("acled_conflict_index_fullyear2024_allcolumns-2.csv"))
         
         # Source C: Chapter 1 Projections (The numbers)
         # We load this to ensure Chapter 2 matches Chapter 1 exactly.
-        with open("../data/roots_data.json", "r") as f:
+        with open(data_path("roots_data.json"), "r") as f:
             roots_data = json.load(f)
             
     except Exception as e:
         print(f"Error loading data: {e}")
         print("Make sure you have run 'calculate_roots.py' first to generate roots_data.json!")
-        return
+        return False
 
     # 2. FILTER DATE (2020 - 2025)
-    df_incidents['Date'] = pd.to_datetime(df_incidents['Date'], errors='coerce')
     df_incidents = df_incidents[df_incidents['Date'].dt.year.between(2020, 2025)]
     standard_name = "Democratic Republic of Congo"
     # 3. STANDARDIZE NAMES (Robust Mapping)
@@ -59,10 +82,19 @@ def process_chapter2():
         "State of Palestine": "Palestine"
     }
     
-    df_incidents['Country'] = df_incidents['Country'].replace(name_map)
+    df_incidents['Country'] = map_categories(df_incidents['Country'], lambda c: name_map.get(c, c))
     df_acled['Country'] = df_acled['Country'].replace(name_map)
+
+    # Per-country work (sharded across processes when workers > 1)
+    if workers > 1:
+        columns = ['Country ISO', 'Location Where Sexual Violence Was Committed']
+        with ShardStore(df_incidents, columns) as store:
+            per_country = store.map(country_kernel, workers=workers)
+    else:
+        per_country = {c: country_kernel(c, g) for c, g in df_incidents.groupby('Country', sort=True, observed=True)}
+
     # NEW: Create an ISO mapping from your raw incidents
-    iso_map = df_incidents.set_index('Country')['Country ISO'].to_dict()
+    iso_map = {c: r['ISO'] for c, r in per_country.items()}
     # 4. CREATE LOOKUP DICTIONARIES
     
     # A. Projections from Chapter 1 (The Truth)
@@ -81,20 +113,21 @@ def process_chapter2():
 
     # 5. PREPARE MAP DATA (Merging Everything)
     
-    # Group incidents by country to get the "Verified" count
-    country_stats = df_incidents.groupby('Country').size().reset_index(name='Reported')
+    # Incidents per country give the "Verified" count
+    reported_lookup = {c: r['Reported'] for c, r in per_country.items()}
 
     # Build the final list for the map
     final_map_stats = []
     
     # We want to include every country that has EITHER incidents OR a danger score
-    all_countries = set(country_stats['Country']).union(set(df_acled['Country']))
+    # (sorted, so the export order is the same on every run)
+    all_countries = sorted(set(reported_lookup).union(set(df_acled['Country'].dropna())))
     
     max_danger = df_acled['Danger Value'].max()
 
     for country in all_countries:
         # Get Verified Count
-        reported = country_stats.loc[country_stats['Country'] == country, 'Reported'].sum() if country in country_stats['Country'].values else 0
+        reported = reported_lookup.get(country, 0)
         
         # Get Danger Score
         danger = danger_lookup.get(country, 0)
@@ -123,13 +156,15 @@ def process_chapter2():
         })
     # 6. EXPORT MAP DATA
     incidents_geo = df_incidents[['Latitude', 'Longitude', 'Country']].dropna()
+    # float32 in memory; back to float64 at source precision for the JSON
+    incidents_geo = incidents_geo.astype({'Latitude': 'float64', 'Longitude': 'float64', 'Country': str}).round(4)
     
     geo_output = {
         "country_stats": final_map_stats,
         "incidents": incidents_geo.to_dict(orient='records')
     }
 
-    with open("../data/geo_impunity_data.json", "w") as f:
+    with open(data_path("geo_impunity_data.json"), "w") as f:
         json.dump(geo_output, f)
     print(f"Map Data Exported: {len(final_map_stats)} countries processed.")
 
@@ -143,27 +178,13 @@ def process_chapter2():
     # Story A: Shadow Gap (Top 8 most suppressed outliers)
     shadow_gap = sorted(narrative_pool, key=lambda x: x['Multiplier'], reverse=True)[:8]
 
-    # Story B: Texture of Violence (Tactical Categorization)
-    # IMPROVEMENT: Using a more robust keyword list to capture nuances of "Systemic" violence
-    def categorize_location(loc):
-        l = str(loc).lower()
-        public_keywords = ['street', 'road', 'field', 'market', 'open', 'forest', 'village']
-        systemic_keywords = ['detention', 'prison', 'camp', 'captivity', 'police', 'checkpoint', 'barracks', 'base']
-        
-        if any(k in l for k in public_keywords): return "Public"
-        if any(k in l for k in systemic_keywords): return "Systemic"
-        return "Private/Other"
-
-    df_incidents['Cat'] = df_incidents['Location Where Sexual Violence Was Committed'].apply(categorize_location)
-    
     texture_data = []
     # Using Democratic Republic of Congo, Nigeria, and Myanmar as comparative 
     # pillars to show different tactical "textures" globally.
     focus_countries = ["Democratic Republic of Congo", "Nigeria", "Myanmar"]
     for c in focus_countries:
-        subset = df_incidents[df_incidents['Country'] == c]
-        if not subset.empty:
-            dist = subset['Cat'].value_counts(normalize=True).to_dict()
+        if c in per_country:
+            dist = per_country[c]['Texture']
             texture_data.append({
                 "Country": c,
                 "Public": round(dist.get("Public", 0) * 100, 1),
@@ -206,13 +227,17 @@ def process_chapter2():
     }
 
     try:
-        with open("../data/narrative_data.json", "w") as f:
+        with open(data_path("narrative_data.json"), "w") as f:
             json.dump(narrative_output, f, indent=4)
         print("--- Narrative Data Exported Successfully ---")
         print(f"Top Shadow Outlier: {shadow_gap[0]['Country']} ({shadow_gap[0]['Multiplier']}x)")
         print(f"Total Black Holes identified: {len([p for p in prognosis_data if p['Category'] == 'Black Hole'])}")
     except Exception as e:
         print(f"Error exporting narrative data: {e}")
+        return False
+    return True
 
 if __name__ == "__main__":
-    process_chapter2()
\ No newline at end of file
+    # Usage: python process_chapter2_data.py [workers]
+    ok = process_chapter2(workers=int(sys.argv[1]) if len(sys.argv) > 1 else 1)
+    sys.exit(0 if ok else 1)
\ No newline at end of file
@@ -0,0 +1,381 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import re
+import sys
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+import pandas as pd
+
+from incidents import load_incidents, load_projections
+from sankey import build_sankey
+
+# Local query service for data_disc.html and the chapter pages.
+# Loads the cleaned incidents and Chapter 1 projections once, then answers
+# aggregation queries as JSON:
+#
+#   /incidents?country=Sudan,Ethiopia&start=2023-04&end=2024-12&dims=Country,Month
+#   /sankey?dims=Country,Perpetrator,Location,Type,Sex&min_flow=5
+#   /projections?country=Sudan
+#   /dimensions
+#
+# Usage: python query_server.py [port]   (default 8001)
+
+CACHE_SIZE = 256
+MIN_GZIP_BYTES = 512
+
+# Date bounds that name a whole period rather than a day
+YEAR_PATTERN = re.compile(r"^\d{4}$")
+MONTH_PATTERN = re.compile(r"^\d{4}-\d{1,2}$")
+
+# Friendly names for the dimensions the pages ask for most
+DIMENSIONS = {
+    "Country": "Country",
+    "Year": "Year",
+    "Month": "MonthYear",
+    "Admin1": "Admin 1",
+    "Location": "Location Where Sexual Violence Was Committed",
+    "Perpetrator": "Reported Perpetrator",
+    "PerpetratorName": "Reported Perpetrator Name",
+    "Sex": "Survivor Or Victim Sex",
+    "AgeGroup": "Adult or Minor ",
+    "Type": "Type of SV",
+    "Context": "SV Context",
+}
+
+
+class QueryError(Exception):
+    pass
+
+
+class QueryEngine:
+    def __init__(self, data_dir=None, cache_size=CACHE_SIZE):
+        self.df = load_incidents(data_dir)
+        self.df['Year'] = self.df['Date'].dt.year
+        self.df['MonthYear'] = self.df['Date'].dt.to_period('M').astype(str)
+        self.projections = load_projections(data_dir)
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()   # key -> Response
+        self._pending = {}            # key -> Future, coalesces identical misses
+
+    # ==========================================
+    # 1. QUERY NORMALIZATION
+    # ==========================================
+    # Equivalent URLs (reordered params, duplicate countries, "2023-04" vs
+    # "2023-04-01") map to one cache key.
+    def normalize(self, path, query):
+        params = parse_qs(query)
+
+        def listed(name):
+            values = []
+            for v in params.get(name, []):
+                values.extend(x.strip() for x in v.split(",") if x.strip())
+            return values
+
+        countries = tuple(sorted(set(listed("country"))))
+
+        if path == "/projections":
+            return (path, countries)
+
+        if path in ("/incidents", "/sankey"):
+            start = self._parse_date(params.get("start", [None])[0], "start")
+            end = self._parse_date(params.get("end", [None])[0], "end")
+            dims = []
+            for d in listed("dims"):
+                if d not in DIMENSIONS:
+                    raise QueryError(f"Unknown dimension '{d}'. Try /dimensions")
+                if d not in dims:
+                    dims.append(d)
+            # Dimension order is kept: it decides the row order / flow order of the output
+            if path == "/incidents":
+                return (path, countries, start, end, tuple(dims))
+
+            if len(dims) < 2:
+                raise QueryError("A Sankey needs at least two dims")
+            try:
+                min_flow = int(params.get("min_flow", ["0"])[0])
+            except ValueError:
+                raise QueryError("min_flow must be an integer")
+            return (path, countries, start, end, tuple(dims), max(min_flow, 0))
+
+        if path == "/dimensions":
+            return (path,)
+
+        raise QueryError(f"Unknown endpoint '{path}'")
+
+    @staticmethod
+    def _parse_date(value, name):
+        if not value:
+            return None
+        value = value.strip()
+        if YEAR_PATTERN.match(value):
+            ts, period_end = pd.Timestamp(int(value), 1, 1), pd.offsets.YearEnd(0)
+        elif MONTH_PATTERN.match(value):
+            year, month = value.split("-")
+            if not 1 <= int(month) <= 12:
+                raise QueryError(f"Invalid {name} date '{value}'")
+            ts, period_end = pd.Timestamp(int(year), int(month), 1), pd.offsets.MonthEnd(0)
+        else:
+            ts, period_end = pd.to_datetime(value, errors='coerce'), None
+            if pd.isna(ts):
+                raise QueryError(f"Invalid {name} date '{value}'")
+        # A bare month/year as the end bound covers the whole period
+        if name == "end" and period_end is not None:
+            ts = ts + period_end
+        return ts.strftime('%Y-%m-%d')
+
+    # ==========================================
+    # 2. QUERY EXECUTION (runs in a worker thread)
+    # ==========================================
+    def execute(self, key):
+        path = key[0]
+
+        if path == "/dimensions":
+            return {"dimensions": sorted(DIMENSIONS), "countries": sorted(self.df['Country'].dropna().unique())}
+
+        if path == "/projections":
+            countries = key[1] or sorted(self.projections)
+            return {"projections": [self.projections[c] for c in countries if c in self.projections]}
+
+        path, countries, start, end, dims = key[:5]
+        mask = pd.Series(True, index=self.df.index)
+        if countries:
+            mask &= self.df['Country'].isin(countries)
+        if start:
+            mask &= self.df['Date'] >= start
+        if end:
+            mask &= self.df['Date'] <= end
+        subset = self.df.loc[mask]
+
+        if path == "/sankey":
+            sankey = build_sankey({d: subset[DIMENSIONS[d]] for d in dims}, list(dims), min_flow=key[5])
+            sankey["query"] = {"country": list(countries), "start": start, "end": end,
+                               "dims": list(dims), "min_flow": key[5]}
+            return sankey
+
+        if dims:
+            columns = [DIMENSIONS[d] for d in dims]
+            grouped = subset.groupby(columns, dropna=False, observed=True).size().reset_index(name='count')
+            grouped.columns = list(dims) + ['count']
+            grouped = grouped.astype(object).where(grouped.notna(), None)
+            rows = grouped.to_dict(orient='records')
+        else:
+            rows = []
+
+        return {
+            "query": {"country": list(countries), "start": start, "end": end, "dims": list(dims)},
+            "total": int(len(subset)),
+            "rows": rows,
+        }
+
+    # ==========================================
+    # 3. LRU RESULT CACHE (event loop thread only)
+    # ==========================================
+    async def lookup(self, key):
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            try:
+                # shield: a waiter being cancelled must not cancel the shared future
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+            # The request computing this key was cancelled; take it over
+            return await self.lookup(key)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[key] = future
+        try:
+            result = await loop.run_in_executor(None, self._render, key)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved if nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._pending[key]
+            if not future.done():
+                # Cancelled (CancelledError is not an Exception): release the waiters
+                future.cancel()
+
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def _render(self, key):
+        body = json.dumps(self.execute(key), default=str).encode("utf-8")
+        return Response(body)
+
+
+class Response:
+    # Serialized once per cache entry: body, gzip body and ETags
+    def __init__(self, body):
+        self.body = body
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        if len(body) >= MIN_GZIP_BYTES:
+            self.gzip_body = gzip.compress(body, compresslevel=6)
+            self.gzip_etag = f'"{digest}-gz"'
+        else:
+            self.gzip_body = None
+            self.gzip_etag = None
+
+
+# ==========================================
+# 4. HTTP LAYER (asyncio streams, keep-alive)
+# ==========================================
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 431: "Request Header Fields Too Large",
+               500: "Internal Server Error"}
+
+
+def _write(writer, status, headers, body=b""):
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}"]
+    headers.setdefault("Content-Length", str(len(body)))
+    headers["Access-Control-Allow-Origin"] = "*"
+    lines.extend(f"{k}: {v}" for k, v in headers.items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+
+def _error(writer, status, message, keep_alive):
+    body = json.dumps({"error": message}).encode("utf-8")
+    _write(writer, status, {"Content-Type": "application/json",
+                            "Connection": "keep-alive" if keep_alive else "close"}, body)
+
+
+async def handle_connection(engine, reader, writer):
+    try:
+        while True:
+            # readline() raises ValueError past the stream limit (64 KiB)
+            try:
+                request_line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                _error(writer, 400, "Request line too long", False)
+                await writer.drain()
+                break
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                _error(writer, 400, "Malformed request line", False)
+                await writer.drain()
+                break
+
+            headers = {}
+            try:
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+            except (ValueError, asyncio.LimitOverrunError):
+                _error(writer, 431, "Request header too large", False)
+                await writer.drain()
+                break
+
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+            if method not in ("GET", "HEAD"):
+                _error(writer, 405, f"Method {method} not allowed", keep_alive)
+            else:
+                await respond(engine, writer, method, target, headers, keep_alive)
+
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+def _accepts_gzip(accept_encoding):
+    # An explicit gzip entry wins over "*"; q=0 means refused
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.lower()] = q
+    q = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0)))
+    return q > 0
+
+
+async def respond(engine, writer, method, target, headers, keep_alive):
+    url = urlsplit(target)
+    try:
+        key = engine.normalize(url.path.rstrip("/") or "/", url.query)
+        result = await engine.lookup(key)
+    except QueryError as e:
+        status = 404 if str(e).startswith("Unknown endpoint") else 400
+        _error(writer, status, str(e), keep_alive)
+        return
+    except Exception as e:
+        print(f"Error answering {target}: {e}")
+        _error(writer, 500, "Query failed", keep_alive)
+        return
+
+    use_gzip = result.gzip_body is not None and _accepts_gzip(headers.get("accept-encoding", ""))
+    body, etag = (result.gzip_body, result.gzip_etag) if use_gzip else (result.body, result.etag)
+
+    out = {
+        "Content-Type": "application/json; charset=utf-8",
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+        "Connection": "keep-alive" if keep_alive else "close",
+    }
+
+    # Conditional GET: either representation's tag means the client is current
+    if_none_match = headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if "*" in tags or result.etag in tags or (result.gzip_etag and result.gzip_etag in tags):
+            out["Content-Length"] = "0"
+            _write(writer, 304, out)
+            return
+
+    if use_gzip:
+        out["Content-Encoding"] = "gzip"
+    out["Content-Length"] = str(len(body))
+    _write(writer, 200, out, b"" if method == "HEAD" else body)
+
+
+async def serve(port=8001, host="127.0.0.1", data_dir=None):
+    print("--- Loading incidents & projections ---")
+    engine = QueryEngine(data_dir)
+    print(f"Loaded {len(engine.df)} incidents, {len(engine.projections)} projected countries")
+
+    server = await asyncio.start_server(
+        lambda r, w: handle_connection(engine, r, w), host, port)
+    print(f"--- Query server listening on http://{host}:{port} ---")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8001
+    try:
+        asyncio.run(serve(port))
+    except KeyboardInterrupt:
+        print("Stopped.")
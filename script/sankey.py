@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# N-stage Sankey builder.
+#
+# Takes an ordered list of categorical dimensions (e.g. Country -> Perpetrator
+# -> Location -> SV Type -> Victim sex) and returns d3-sankey ready JSON:
+#
+#   {"nodes": [{"name": "Sudan", "stage": "Country"}, ...],
+#    "links": [{"source": 0, "target": 7, "value": 42}, ...]}
+#
+# Links reference nodes by index (d3-sankey's default nodeId), so the page
+# does not resolve names, and the same label may appear in several stages.
+# Every dimension is integer-coded once; the counts for all adjacent pairs come
+# from a single bincount over offset-encoded (source, target) keys.
+
+
+def _codes(values):
+    # Integer codes + labels for one dimension; -1 marks missing
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(dtype=np.int64), [str(c) for c in series.cat.categories]
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes.astype(np.int64), [str(u) for u in uniques]
+
+
+def build_sankey(frame, dimensions, min_flow=0):
+    """Nodes and index-based links for the flow dimensions[0] -> ... -> dimensions[-1].
+
+    frame: DataFrame (or dict of equal-length Series) holding the dimensions.
+    min_flow: links carrying fewer rows are dropped, then nodes left without links.
+    """
+    if len(dimensions) < 2:
+        raise ValueError("A Sankey needs at least two dimensions")
+
+    # 1. INTEGER-CODE EVERY DIMENSION
+    coded = [_codes(frame[d]) for d in dimensions]
+    sizes = [len(labels) for _, labels in coded]
+    node_offsets = np.cumsum([0] + sizes)
+
+    # 2. ALL ADJACENT-PAIR CROSSTABS IN ONE BINCOUNT
+    # Pair k occupies sizes[k] * sizes[k+1] consecutive bins.
+    pair_sizes = [sizes[k] * sizes[k + 1] for k in range(len(dimensions) - 1)]
+    pair_offsets = np.cumsum([0] + pair_sizes)
+    keys = []
+    for k in range(len(dimensions) - 1):
+        (src, _), (dst, _) = coded[k], coded[k + 1]
+        valid = (src >= 0) & (dst >= 0)
+        keys.append(pair_offsets[k] + src[valid] * sizes[k + 1] + dst[valid])
+    counts = np.bincount(np.concatenate(keys), minlength=pair_offsets[-1]) if keys else np.zeros(0, np.int64)
+
+    # 3. LINKS (global node index = stage offset + code), pruned by min_flow
+    sources, targets, values = [], [], []
+    for k in range(len(dimensions) - 1):
+        block = counts[pair_offsets[k]:pair_offsets[k + 1]]
+        hits = np.flatnonzero(block >= max(min_flow, 1))
+        sources.append(node_offsets[k] + hits // sizes[k + 1])
+        targets.append(node_offsets[k + 1] + hits % sizes[k + 1])
+        values.append(block[hits])
+    sources, targets, values = np.concatenate(sources), np.concatenate(targets), np.concatenate(values)
+
+    # 4. NODES: keep only those still linked, renumbered in stage order
+    used = np.zeros(node_offsets[-1], dtype=bool)
+    used[sources] = True
+    used[targets] = True
+    new_index = np.cumsum(used) - 1
+
+    nodes = []
+    for k, d in enumerate(dimensions):
+        labels = coded[k][1]
+        for code in np.flatnonzero(used[node_offsets[k]:node_offsets[k + 1]]):
+            nodes.append({"name": labels[code], "stage": d})
+
+    links = [{"source": int(s), "target": int(t), "value": int(v)}
+             for s, t, v in zip(new_index[sources], new_index[targets], values)]
+    return {"nodes": nodes, "links": links}
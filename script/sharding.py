@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+# Country-sharded execution for the per-country chapter computations.
+#
+# The cleaned incident frame is written once as memory-mapped columnar files:
+# rows sorted by country, text columns dictionary-encoded (int32 codes + a
+# JSON category list), dates as int64 nanoseconds. A shard is a contiguous
+# row range, so a worker process opens the .npy files with mmap_mode='r' and
+# slices its country without any frame being pickled across processes.
+# Results come back as plain dicts and are merged in sorted country order, so
+# the output does not depend on worker scheduling.
+
+MANIFEST = "manifest.json"
+
+
+class ShardStore:
+    def __init__(self, df, columns, country_col='Country'):
+        self.dir = tempfile.mkdtemp(prefix="incident_shards_")
+        columns = list(dict.fromkeys([country_col] + list(columns)))
+
+        # 1. SORT BY COUNTRY (stable, so row order inside a shard is kept)
+        df = df.loc[df[country_col].notna(), columns]
+        df = df.iloc[np.argsort(df[country_col].astype(str).to_numpy(), kind='stable')]
+
+        # 2. WRITE COLUMNS
+        manifest = {"rows": len(df), "columns": {}, "shards": {}}
+        for col in columns:
+            path = os.path.join(self.dir, f"{len(manifest['columns'])}.npy")
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                np.save(path, df[col].to_numpy(dtype='datetime64[ns]').view('int64'))
+                manifest["columns"][col] = {"file": path, "kind": "datetime"}
+            elif pd.api.types.is_numeric_dtype(df[col]):
+                np.save(path, df[col].to_numpy())
+                manifest["columns"][col] = {"file": path, "kind": "numeric"}
+            else:
+                codes, uniques = pd.factorize(df[col], sort=True)
+                np.save(path, codes.astype(np.int32))
+                manifest["columns"][col] = {"file": path, "kind": "category",
+                                            "categories": [str(u) for u in uniques]}
+
+        # 3. SHARD OFFSETS (contiguous row range per country)
+        keys = df[country_col].astype(str).to_numpy()
+        if len(keys):
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            stops = np.r_[starts[1:], len(keys)]
+            for s, e in zip(starts, stops):
+                manifest["shards"][keys[s]] = [int(s), int(e)]
+
+        with open(os.path.join(self.dir, MANIFEST), "w") as f:
+            json.dump(manifest, f)
+        self.countries = sorted(manifest["shards"])
+
+    def map(self, kernel, countries=None, workers=None, **kwargs):
+        """Run kernel(country, frame, **kwargs) per country; returns {country: result} in sorted order."""
+        countries = sorted(set(self.countries if countries is None else countries))
+        task = partial(_run_shard, self.dir, kernel, kwargs)
+        workers = min(len(countries), workers or os.cpu_count() or 1)
+        if workers <= 1:
+            results = list(map(task, countries))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(task, countries))
+        return dict(zip(countries, results))
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_manifest_cache = {}
+
+
+def open_shard(store_dir, country):
+    """Frame for one country, backed by the memory-mapped column files."""
+    manifest = _manifest_cache.get(store_dir)
+    if manifest is None:
+        with open(os.path.join(store_dir, MANIFEST), "r") as f:
+            manifest = _manifest_cache[store_dir] = json.load(f)
+
+    start, stop = manifest["shards"].get(country, (0, 0))
+    data = {}
+    for col, meta in manifest["columns"].items():
+        values = np.load(meta["file"], mmap_mode='r')[start:stop]
+        if meta["kind"] == "datetime":
+            data[col] = values.view('datetime64[ns]')
+        elif meta["kind"] == "category":
+            data[col] = pd.Categorical.from_codes(values, categories=meta["categories"])
+        else:
+            data[col] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def _run_shard(store_dir, kernel, kwargs, country):
+    return kernel(country, open_shard(store_dir, country), **kwargs)
+
+
+def country_rng(seed, country):
+    # Independent stream per country: identical results serial or in parallel
+    return np.random.default_rng([seed, zlib.crc32(country.encode("utf-8"))])
@@ -0,0 +1,452 @@
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+from collections import Counter
+
+from lineage import failure_reason
+from pdf_extract import file_hash
+
+# Golden-output equivalence checker.
+#
+# Runs a legacy and a new version of the chapter scripts on the same inputs
+# under a fixed seed, then compares every JSON artifact:
+#
+#   1. streamed sha256 of the raw bytes (identical files stop here)
+#   2. per-section digests of the canonical form, computed while streaming
+#      the file element by element: keys sorted, floats rounded to N
+#      significant digits, integral floats as ints, lists declared as sets
+#      compared order-insensitively
+#   3. on a digest mismatch, streamed passes compare the section with a float
+#      tolerance (math.isclose, rel 10**(1-N), abs 10**-N) and report the
+#      first divergence
+#
+# Rounding only buckets floats for the digests: two values a hair apart on
+# either side of a rounding boundary hash differently, so a digest mismatch
+# means "maybe different" and step 3 decides.
+#
+# No artifact is ever loaded whole except the small ones that need a
+# whole-document transform (the Sankey, whose links are resolved to names so
+# index-based and name-based versions compare equal).
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPT_DIR)
+
+# Chapter scripts in build order (chapter 2 reads roots_data.json)
+CHAPTER_SCRIPTS = ["chapter1.py", "process_chapter2_data.py", "chapter3.py", "chapter4.py", "chapter5.py"]
+SHARDED_SCRIPTS = {"process_chapter2_data.py", "chapter4.py"}
+
+# Inputs shared by both sides (see prepare_inputs)
+INPUTS = ["raw_incidents.csv", "acled_conflict_index_fullyear2024_allcolumns-2.csv", "book", ".cache"]
+
+
+def _sankey_by_name(doc):
+    # Index-based or name-based links -> name-based, stage labels dropped
+    names = [n["name"] for n in doc["nodes"]]
+    resolve = lambda ref: names[ref] if isinstance(ref, int) else ref
+    yield from (("$.nodes[]", n) for n in sorted(set(names)))
+    for link in doc["links"]:
+        yield "$.links[]", {"source": resolve(link["source"]), "target": resolve(link["target"]),
+                            "value": link["value"]}
+
+
+# Per-artifact rules. "sets": sections whose element order is not meaningful.
+# "random": outputs drawn from the RNG; they only match if the stream is unchanged.
+ARTIFACTS = {
+    "roots_data.json": {"sets": ["$[]"]},
+    "geo_impunity_data.json": {"sets": ["$.country_stats[]", "$.incidents[]"]},
+    # shadow_gap ties (equal multipliers) came out in set order before
+    "narrative_data.json": {"sets": ["$.prognosis_data[]", "$.shadow_gap[]"]},
+    "ch3_timeline.json": {},
+    "ch3_ridgeline.json": {"sets": ["$[]"]},
+    "ch3_demographics.json": {"random": True},
+    "ch3_sankey.json": {"sets": ["$.nodes[]", "$.links[]"], "transform": _sankey_by_name},
+    "ch4_stripes.json": {"sets": ["$[]"]},
+    "ch4_pyramid.json": {"random": True},
+    "ch4_waffle.json": {"sets": ["$[]"], "random": True},
+    "ch5_funnel.json": {},
+    "ch5_reparations.json": {"ignore": ["Provenance"]},
+    "ch5_network.json": {"sets": ["$.nodes[]", "$.links[]"]},
+}
+
+
+# Set sections with more unmatched elements than this are reported without
+# the tolerance check (which holds the unmatched elements in memory)
+SET_MISMATCH_LIMIT = 1000
+
+
+# ==========================================
+# 1. STREAMING
+# ==========================================
+class _JsonStream:
+    # Incremental reader over a text file: raw_decode one value at a time
+    WS = " \t\r\n"
+
+    def __init__(self, f, chunk_size=1 << 20):
+        self.f, self.chunk_size = f, chunk_size
+        self.buf, self.pos, self.eof = "", 0, False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        data = self.f.read(self.chunk_size)
+        self.eof = not data
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self.WS:
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos] if self.pos < len(self.buf) else ""
+            self._fill()
+
+    def take(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number that ends the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def array(self):
+        self.take("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.take("]")
+                return
+
+
+def stream_items(path, spec=None):
+    """Yield (section, value): top-level array elements as "$[]", object members
+    as "$.key" or, for array members, one "$.key[]" item per element."""
+    spec = spec or {}
+    if spec.get("transform"):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from spec["transform"](json.load(f))
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        s = _JsonStream(f)
+        head = s.peek()
+        if head == "[":
+            for item in s.array():
+                yield "$[]", item
+        elif head == "{":
+            s.take("{")
+            while s.peek() != "}":
+                key = s.value()
+                s.take(":")
+                if s.peek() == "[":
+                    for item in s.array():
+                        yield f"$.{key}[]", item
+                else:
+                    yield f"$.{key}", s.value()
+                if s.peek() == ",":
+                    s.pos += 1
+            s.take("}")
+        else:
+            yield "$", s.value()
+
+
+# ==========================================
+# 2. CANONICAL FORM & DIGESTS
+# ==========================================
+def canonical(value, digits=9, ignore=()):
+    # digits=None keeps floats unrounded (for the tolerance comparison)
+    if isinstance(value, float):
+        if value != value or value in (float("inf"), float("-inf")):
+            return repr(value)
+        if digits is not None:
+            value = float(f"{value:.{digits}g}")
+        return int(value) if value.is_integer() else value
+    if isinstance(value, dict):
+        return {k: canonical(v, digits, ignore) for k, v in value.items() if k not in ignore}
+    if isinstance(value, list):
+        return [canonical(v, digits, ignore) for v in value]
+    return value
+
+
+def _encode(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _digest(value):
+    return hashlib.sha256(_encode(value)).digest()
+
+
+def section_digests(path, spec, digits):
+    """{section: (count, digest)}; ordered sections chain a sha256, set sections
+    add per-element digests modulo 2**256 (order-insensitive multiset hash)."""
+    sets, ignore = set(spec.get("sets", [])), spec.get("ignore", ())
+    state = {}
+    for section, value in stream_items(path, spec):
+        digest = _digest(canonical(value, digits, ignore))
+        count, acc = state.get(section, (0, None))
+        if section in sets:
+            acc = ((acc or 0) + int.from_bytes(digest, "big")) % (1 << 256)
+        else:
+            acc = acc or hashlib.sha256()
+            acc.update(digest)
+        state[section] = (count + 1, acc)
+    return {k: (n, acc if isinstance(acc, int) else acc.hexdigest()) for k, (n, acc) in state.items()}
+
+
+# ==========================================
+# 3. FIRST DIVERGENCE
+# ==========================================
+def _short(value, limit=120):
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _close(a, b, digits):
+    numbers = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (a, b))
+    if numbers:
+        return math.isclose(a, b, rel_tol=10.0 ** (1 - digits), abs_tol=10.0 ** -digits)
+    return a == b
+
+
+def first_difference(a, b, path, digits=9):
+    # Path and values of the first differing leaf between two canonical values;
+    # numbers are compared with the float tolerance
+    if isinstance(a, dict) and isinstance(b, dict):
+        for k in sorted(set(a) | set(b)):
+            if k not in a or k not in b:
+                return f"{path}.{k}", a.get(k, "<missing>"), b.get(k, "<missing>")
+            diff = first_difference(a[k], b[k], f"{path}.{k}", digits)
+            if diff:
+                return diff
+        return None
+    if isinstance(a, list) and isinstance(b, list):
+        for i, (x, y) in enumerate(zip(a, b)):
+            diff = first_difference(x, y, f"{path}[{i}]", digits)
+            if diff:
+                return diff
+        if len(a) != len(b):
+            return f"{path}.length", len(a), len(b)
+        return None
+    return None if _close(a, b, digits) else (path, a, b)
+
+
+def find_divergence(path_a, path_b, section, spec, digits):
+    """Message for the first difference in a section whose digests differ, or
+    None if every difference is within the float tolerance."""
+    ignore = spec.get("ignore", ())
+    values = lambda p: (v for s, v in stream_items(p, spec) if s == section)
+
+    if section in spec.get("sets", []):
+        return _set_divergence(path_a, path_b, section, values, digits, ignore)
+
+    a_iter = (canonical(v, None, ignore) for v in values(path_a))
+    b_iter = (canonical(v, None, ignore) for v in values(path_b))
+    index = 0
+    for a in a_iter:
+        b = next(b_iter, "<missing>")
+        diff = first_difference(a, b, section.replace("[]", f"[{index}]"), digits)
+        if diff:
+            where, x, y = diff
+            return f"{where}: {_short(x)} != {_short(y)}"
+        index += 1
+    extra = sum(1 for _ in b_iter)
+    return f"{section} has {extra} extra element(s) on the new side" if extra else None
+
+
+def _set_divergence(path_a, path_b, section, values, digits, ignore):
+    # A. MULTISET DIFFERENCE of the bucketed element digests (digests only)
+    counts = Counter()
+    for sign, p in ((1, path_a), (-1, path_b)):
+        for value in values(p):
+            counts[_digest(canonical(value, digits, ignore))] += sign
+    unmatched = {key: n for key, n in counts.items() if n}
+    del counts
+    if not unmatched:
+        return None
+
+    # B. SECOND PASS: fetch the unmatched elements, unrounded. Past the limit
+    # only the first one is fetched, and reported without the tolerance check.
+    pair_up = sum(abs(n) for n in unmatched.values()) <= SET_MISMATCH_LIMIT
+    if not pair_up:
+        first = next(iter(unmatched))
+        unmatched = {first: 1 if unmatched[first] > 0 else -1}
+    fetched = {}
+    for sign, p in ((1, path_a), (-1, path_b)):
+        need = {key: n * sign for key, n in unmatched.items() if n * sign > 0}
+        remaining = sum(need.values())
+        fetched[sign] = []
+        for value in values(p) if remaining else ():
+            key = _digest(canonical(value, digits, ignore))
+            if need.get(key):
+                need[key] -= 1
+                fetched[sign].append(canonical(value, None, ignore))
+                remaining -= 1
+                if not remaining:
+                    break
+
+    # C. PAIR WITHIN TOLERANCE; whatever is left over is a real difference
+    legacy, new = fetched[1], fetched[-1]
+    if pair_up:
+        for x in list(legacy):
+            match = next((y for y in new if first_difference(x, y, section, digits) is None), None)
+            if match is not None:
+                legacy.remove(x)
+                new.remove(match)
+    for side, leftover in (("legacy", legacy), ("new", new)):
+        if leftover:
+            return f"{section} element only on the {side} side: {_short(leftover[0])}"
+    return None
+
+
+def compare_artifact(name, path_a, path_b, digits=9):
+    """(equal, message) for one artifact produced by both sides."""
+    spec = ARTIFACTS.get(name, {})
+    if not os.path.exists(path_a) or not os.path.exists(path_b):
+        side = "legacy" if not os.path.exists(path_a) else "new"
+        return False, f"missing on the {side} side"
+
+    hash_a = file_hash(path_a)
+    if hash_a == file_hash(path_b):
+        return True, f"identical (sha256 {hash_a[:12]})"
+
+    digests_a = section_digests(path_a, spec, digits)
+    digests_b = section_digests(path_b, spec, digits)
+    within_tolerance = False
+    for section in sorted(set(digests_a) | set(digests_b)):
+        if section not in digests_a or section not in digests_b:
+            side = "legacy" if section not in digests_a else "new"
+            return False, f"{section} missing on the {side} side"
+        (n_a, d_a), (n_b, d_b) = digests_a[section], digests_b[section]
+        if d_a != d_b:
+            message = find_divergence(path_a, path_b, section, spec, digits)
+            if message is None:
+                within_tolerance = True
+                continue
+            if n_a != n_b:
+                message += f" ({n_a} vs {n_b} elements)"
+            if spec.get("random"):
+                message += " [random draws: matches only if the RNG stream is unchanged]"
+            return False, message
+    return True, "equivalent within float tolerance" if within_tolerance else "equivalent"
+
+
+# ==========================================
+# 4. RUNNING BOTH SIDES
+# ==========================================
+def prepare_inputs(side_dir, data_root, synthetic_csv=None):
+    # Inputs are symlinked; outputs land in side_dir. .cache is the real
+    # Data/.cache, so a PDF cache miss is written through to it: entries are
+    # keyed by content hash and replaced atomically, so both sides (and later
+    # builds) can share them.
+    os.makedirs(side_dir, exist_ok=True)
+    for name in INPUTS:
+        src = synthetic_csv if (name == "raw_incidents.csv" and synthetic_csv) else os.path.join(data_root, name)
+        if os.path.exists(src):
+            os.symlink(os.path.abspath(src), os.path.join(side_dir, name))
+
+
+def export_revision(rev, dest):
+    """Check out script/ at a git revision into dest; returns the script dir."""
+    archive = subprocess.run(["git", "-C", REPO_ROOT, "archive", "--format=tar", rev, "script"],
+                             capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        safe = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+        tar.extractall(dest, **safe)
+    return os.path.join(dest, "script")
+
+
+def run_scripts(script_dir, side_dir, seed, workers=1):
+    """Run each chapter script as __main__ with the global RNGs seeded.
+
+    Older revisions read '../data/...' relative to their script folder, so a
+    'data' link next to it points at side_dir; newer ones read LINEAGE_DATA_ROOT.
+    """
+    link = os.path.join(os.path.dirname(script_dir), "data")
+    if not os.path.lexists(link):
+        os.symlink(side_dir, link)
+    env = dict(os.environ, LINEAGE_DATA_ROOT=side_dir)
+    failures = []
+    for script in CHAPTER_SCRIPTS:
+        if not os.path.exists(os.path.join(script_dir, script)):
+            continue
+        argv = [str(workers)] if (workers > 1 and script in SHARDED_SCRIPTS) else []
+        runner = ("import random, runpy, sys, numpy; "
+                  f"random.seed({seed}); numpy.random.seed({seed}); "
+                  f"sys.argv = [{script!r}] + {argv!r}; "
+                  f"runpy.run_path({script!r}, run_name='__main__')")
+        proc = subprocess.run([sys.executable, "-c", runner], cwd=script_dir, env=env,
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            failures.append(f"{script}: {failure_reason(proc)}")
+    return failures
+
+
+def make_synthetic(src_csv, dst_csv, rows, seed):
+    # Resample real rows (with replacement) up to the requested size
+    import pandas as pd
+    df = pd.read_csv(src_csv)
+    df.sample(n=rows, replace=True, random_state=seed).to_csv(dst_csv, index=False)
+
+
+def verify(data_root, legacy="HEAD", workers=1, seed=0, synthetic_rows=None, digits=9, keep=False):
+    """Run both sides and print one line per artifact; returns True if all match."""
+    work = tempfile.mkdtemp(prefix="lineage_verify_")
+    try:
+        synthetic_csv = None
+        if synthetic_rows:
+            synthetic_csv = os.path.join(work, "raw_incidents.csv")
+            make_synthetic(os.path.join(data_root, "raw_incidents.csv"), synthetic_csv, synthetic_rows, seed)
+            print(f"Synthetic input: {synthetic_rows} rows")
+
+        sides = {}
+        all_equal = True
+        for side, rev in (("legacy", legacy), ("new", None)):
+            out = os.path.join(work, side, "Data")
+            prepare_inputs(out, data_root, synthetic_csv)
+            if rev in (None, "."):
+                script_dir = os.path.join(work, side, "script")
+                shutil.copytree(SCRIPT_DIR, script_dir, ignore=shutil.ignore_patterns("__pycache__"))
+            else:
+                script_dir = export_revision(rev, os.path.join(work, side))
+            label = f"{side} ({rev or 'working tree'}, workers={workers if side == 'new' else 1})"
+            print(f"Running {label} ...")
+            for failure in run_scripts(script_dir, out, seed, workers if side == "new" else 1):
+                print(f"  failed: {failure}")
+                all_equal = False
+            sides[side] = out
+
+        names = sorted(set(ARTIFACTS)
+                       | {n for d in sides.values() for n in os.listdir(d) if n.endswith(".json")})
+        for name in names:
+            equal, message = compare_artifact(name, os.path.join(sides["legacy"], name),
+                                              os.path.join(sides["new"], name), digits)
+            all_equal &= equal
+            print(f"{'OK  ' if equal else 'DIFF'}  {name:<24} {message}")
+        return all_equal
+    finally:
+        if keep:
+            print(f"Outputs kept in {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)